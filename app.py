@@ -1,15 +1,53 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import jdatetime
-from datetime import time, date, datetime
+from datetime import date, datetime, timedelta
+import importlib
 import json
 import os
 import uuid
 from io import BytesIO
 import hashlib
 import sqlite3
+import threading
+import time
+import random
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# ======================
+# LAZY IMPORTS
+# ======================
+class LazyModule:
+    """Module stand-in that imports the module on first attribute access
+
+    Keeps analytics, plotting and Excel libraries out of the login page;
+    on_load is called with the module once it is imported.
+    """
+    def __init__(self, name, on_load=None):
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            module = importlib.import_module(self._name)
+            if self._on_load is not None:
+                self._on_load(module)
+            self._module = module
+        return getattr(self._module, attr)
+
+def configure_pandas(pandas):
+    """Pandas options the shared dataset store relies on"""
+    if int(pandas.__version__.split(".")[0]) < 3:
+        # Frames derived from a shared dataset never write through to it
+        pandas.set_option("mode.copy_on_write", True)
+
+pd = LazyModule("pandas", on_load=configure_pandas)
+np = LazyModule("numpy")
+px = LazyModule("plotly.express")
+go = LazyModule("plotly.graph_objects")
+plotly_subplots = LazyModule("plotly.subplots")
+jdatetime = LazyModule("jdatetime")
+openpyxl = LazyModule("openpyxl")
 
 # ======================
 # PAGE CONFIG
@@ -24,69 +62,755 @@ st.set_page_config(
 # ======================
 # DATABASE SETUP (PERSISTENT STORAGE)
 # ======================
-from supabase import create_client, Client
+SUPABASE_TIMEOUT_SECONDS = 5
+
+SUPABASE_RETRIES = 2
+
+SUPABASE_DEADLINE_SECONDS = 15
+
+SUPABASE_POOL_SIZE = 8
+
+SUPABASE_BREAKER_THRESHOLD = 5
+
+SUPABASE_BREAKER_COOLDOWN_SECONDS = 30
+
+# PostgREST codes for a lost database connection or exhausted pool, and the
+# SQLSTATE classes a retry can clear: connection (08), serialization or
+# deadlock (40), resources (53), cancelled statement (57)
+SUPABASE_TRANSIENT_CODES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+SUPABASE_TRANSIENT_SQLSTATES = ("08", "40", "53", "57")
+
+class SupabaseUnavailable(Exception):
+    """Raised when Supabase is skipped by the circuit breaker or misses the deadline"""
+    pass
 
 @st.cache_resource
 def init_supabase():
-    """Initialize Supabase connection"""
+    """Initialize Supabase connection on first use"""
+    from supabase import create_client, ClientOptions
+    
     url = st.secrets["SUPABASE_URL"]
     key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
+    return create_client(url, key, options=ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT_SECONDS))
+
+@st.cache_resource
+def get_supabase_pool():
+    """Bounded thread pool that runs every Supabase request"""
+    return ThreadPoolExecutor(max_workers=SUPABASE_POOL_SIZE, thread_name_prefix="supabase")
+
+@st.cache_resource
+def get_supabase_breaker():
+    """Circuit breaker state shared by all sessions"""
+    return {"failures": 0, "open_until": 0.0, "lock": threading.Lock()}
+
+def supabase_breaker_open():
+    """True while recent failures keep Supabase calls from being attempted"""
+    return time.monotonic() < get_supabase_breaker()["open_until"]
+
+def is_transient_supabase_error(error):
+    """Whether a failed request may succeed if sent again: timeouts, connection errors, HTTP 5xx/429"""
+    from httpx import TransportError
+    from postgrest.exceptions import APIError
+
+    if isinstance(error, (TransportError, ConnectionError, TimeoutError)):
+        return True
+    if not isinstance(error, APIError):
+        return False
+    # Responses without a PostgREST error body carry the HTTP status as the code
+    code = str(error.code or "")
+    if len(code) == 3 and code.isdigit():
+        return code == "429" or code.startswith("5")
+    return code in SUPABASE_TRANSIENT_CODES or (len(code) == 5 and code[:2] in SUPABASE_TRANSIENT_SQLSTATES)
+
+def call_supabase(request, client, retries=SUPABASE_RETRIES):
+    """Run request(client) with jittered exponential retries behind the circuit breaker
+
+    Only transient errors are retried and counted: after
+    SUPABASE_BREAKER_THRESHOLD consecutive ones the breaker opens for the
+    cooldown, and the first call after it is a trial that closes the breaker
+    on success or reopens it on failure. Errors that would fail the same way
+    again (constraint violations, a bad column, a missing function) are
+    raised at once and leave the breaker alone.
+    """
+    breaker = get_supabase_breaker()
+    for attempt in range(retries + 1):
+        if supabase_breaker_open():
+            raise SupabaseUnavailable("Supabase is not responding, try again shortly")
+        try:
+            result = request(client)
+        except Exception as e:
+            if not is_transient_supabase_error(e):
+                raise
+            with breaker["lock"]:
+                breaker["failures"] += 1
+                if breaker["failures"] >= SUPABASE_BREAKER_THRESHOLD:
+                    breaker["open_until"] = time.monotonic() + SUPABASE_BREAKER_COOLDOWN_SECONDS
+            if attempt == retries:
+                raise
+            time.sleep(random.uniform(0, 0.25 * 2 ** attempt))
+        else:
+            with breaker["lock"]:
+                breaker["failures"] = 0
+            return result
+
+def submit_supabase(request, retries=SUPABASE_RETRIES):
+    """Start request(client) on the Supabase pool, returns a Future"""
+    return get_supabase_pool().submit(call_supabase, request, init_supabase(), retries)
+
+def wait_supabase(future):
+    """Result of a submitted request, raising SupabaseUnavailable past the deadline"""
+    try:
+        return future.result(timeout=SUPABASE_DEADLINE_SECONDS)
+    except TimeoutError:
+        raise SupabaseUnavailable("Supabase did not respond in time")
 
-supabase = init_supabase()
+def run_supabase(request):
+    """Run request(client) on the Supabase pool and wait for it"""
+    return wait_supabase(submit_supabase(request))
 
 # ======================
 # QUEST FUNCTIONS WITH DATABASE
 # ======================
-def load_quests():
-    """Load quests from Supabase"""
-    try:
-        response = supabase.table("quests").select("*").execute()
-        quests = response.data
-        # تبدیل done از عدد به boolean
-        for q in quests:
-            q["done"] = bool(q.get("done", 0))
-        return quests
-    except Exception as e:
-        st.error(f"Error loading quests: {e}")
-        return []
+QUEST_CACHE_TTL_SECONDS = 30
+
+QUEST_PAGE_SIZE = 20
+
+QUEST_SYNC_BATCH_SIZE = 1000
+
+QUEST_SYNC_OVERLAP_SECONDS = 60
+
+# Delta sync expects two extra columns on the Supabase quests table:
+#   alter table quests add column updated_at timestamptz not null default now(),
+#                      add column deleted smallint not null default 0;
+# and a trigger so updated_at is the time the database applied the change,
+# not the time a client queued it:
+#   create or replace function quests_touch() returns trigger language plpgsql as $$
+#   begin new.updated_at = now(); return new; end $$;
+#   create trigger quests_touch before insert or update on quests
+#     for each row execute function quests_touch();
+# Deletes only set deleted = 1 (a tombstone), so a mirror pull fetches rows
+# changed since the newest updated_at seen.
+
+@st.cache_resource
+def get_quest_cache():
+    """Quest query pages shared by all sessions, kept for the TTL and dropped on any write"""
+    return {"queries": {}, "lock": threading.Lock()}
+
+def normalize_quest(quest):
+    """Quest row with done as a boolean"""
+    # تبدیل done از عدد به boolean
+    if "done" in quest:
+        quest["done"] = bool(quest["done"])
+    return quest
+
+def quest_watermark(rows, watermark=None):
+    """Newest updated_at among the rows and the previous watermark"""
+    stamps = [q["updated_at"] for q in rows if q.get("updated_at")]
+    if watermark:
+        stamps.append(watermark)
+    return max(stamps, key=datetime.fromisoformat) if stamps else None
+
+def fetch_quest_changes(client, since=None):
+    """Quest rows changed since the watermark, tombstones included, oldest first
+
+    Without a watermark every live quest is fetched. The window starts
+    QUEST_SYNC_OVERLAP_SECONDS early so rows from transactions that were
+    still committing when the watermark was read are not skipped;
+    applying a row twice is harmless.
+
+    Pages continue from the last (updated_at, id) fetched rather than an
+    offset: a row updated during the pull moves past the cursor and is
+    fetched again, instead of shifting every later row back a position.
+    """
+    rows = []
+    last = None
+    while True:
+        query = client.table("quests").select("*")
+        if since is None:
+            query = query.eq("deleted", 0)
+        else:
+            start = datetime.fromisoformat(since) - timedelta(seconds=QUEST_SYNC_OVERLAP_SECONDS)
+            query = query.gte("updated_at", start.isoformat())
+        if last is not None:
+            stamp = last["updated_at"]
+            query = query.or_(f'updated_at.gt."{stamp}",and(updated_at.eq."{stamp}",id.gt."{last["id"]}")')
+        batch = query.order("updated_at").order("id").limit(QUEST_SYNC_BATCH_SIZE).execute().data
+        rows.extend(batch)
+        if len(batch) < QUEST_SYNC_BATCH_SIZE:
+            return rows
+        last = batch[-1]
+
+def invalidate_quest_queries():
+    """Drop cached quest pages after a write"""
+    cache = get_quest_cache()
+    with cache["lock"]:
+        cache["queries"].clear()
+
+def query_quests_many(queries):
+    """Fetch one page per query as (quests, total_count), overlapping the Supabase requests
+
+    queries is a list of fetch_quest_query keyword dicts; results come
+    back in the same order. Filters, projection and paging are sent to
+    Supabase as PostgREST eq/gte/lte, select and range clauses, so only
+    the shown rows and fields are transferred. Pages are cached for the
+    quest TTL. With the mirror or local backend the same query runs on
+    SQLite.
+    """
+    if get_quests_backend() != "supabase":
+        return [mirror_query_quests(**q) for q in queries]
+
+    keys = [quest_query_key(**q) for q in queries]
+    results = {}
+    cache = get_quest_cache()
+    with cache["lock"]:
+        for key in keys:
+            cached = cache["queries"].get(key)
+            if cached is not None and time.monotonic() - cached[0] < QUEST_CACHE_TTL_SECONDS:
+                results[key] = cached[1:]
+
+    futures = {}
+    for key, q in zip(keys, queries):
+        if key not in results and key not in futures:
+            futures[key] = submit_supabase(lambda client, q=q: fetch_quest_query(client, **q))
+    for key, future in futures.items():
+        try:
+            quests, total = wait_supabase(future)
+        except Exception as e:
+            st.error(f"Error loading quests: {e}")
+            results[key] = ([], 0)
+            continue
+        with cache["lock"]:
+            cache["queries"][key] = (time.monotonic(), quests, total)
+        results[key] = (quests, total)
+    return [([dict(q) for q in results[key][0]], results[key][1]) for key in keys]
+
+def quest_query_key(owner=None, done=None, deadline_from=None, deadline_to=None,
+                    columns="*", page=0, page_size=None):
+    """Cache key of a quest page query"""
+    return (owner, done, str(deadline_from), str(deadline_to), columns, page, page_size)
+
+def fetch_quest_query(client, owner=None, done=None, deadline_from=None, deadline_to=None,
+                      columns="*", page=0, page_size=None):
+    """Run one quest query against Supabase, returns (quests, total_count)"""
+    query = client.table("quests").select(columns, count="exact").eq("deleted", 0)
+    if owner is not None:
+        query = query.eq("owner", owner)
+    if done is not None:
+        query = query.eq("done", 1 if done else 0)
+    if deadline_from is not None:
+        query = query.gte("deadline", str(deadline_from))
+    if deadline_to is not None:
+        query = query.lte("deadline", str(deadline_to))
+    # Stable order so pages do not overlap
+    query = query.order("deadline").order("id")
+    if page_size:
+        query = query.range(page * page_size, (page + 1) * page_size - 1)
+    response = query.execute()
+    quests = [normalize_quest(q) for q in response.data]
+    total = response.count if response.count is not None else len(quests)
+    return quests, total
 
 def add_quest(quest_data):
     """Add a new quest to Supabase"""
     try:
         # تبدیل boolean به عدد برای Supabase
         quest_data["done"] = 1 if quest_data.get("done", False) else 0
-        response = supabase.table("quests").insert(quest_data).execute()
+        if get_quests_backend() != "supabase":
+            return mirror_write("upsert", {"rows": [quest_data]})
+        # Upsert on id so a retried request cannot insert the quest twice
+        response = run_supabase(lambda client: client.table("quests").upsert(quest_data, on_conflict="id").execute())
+        invalidate_quest_queries()
         return True
     except Exception as e:
         st.error(f"Error adding quest: {e}")
         return False
 
-def update_quest(quest_id, updated_data):
-    """Update an existing quest"""
+# ======================
+# BULK QUEST FUNCTIONS
+# ======================
+def upsert_quests(quests):
+    """Create or update a batch of quests in one request, matched on id"""
+    if not quests:
+        return True
     try:
         # تبدیل boolean به عدد برای Supabase
-        updated_data["done"] = 1 if updated_data.get("done", False) else 0
-        response = (supabase.table("quests")
-                   .update(updated_data)
-                   .eq("id", quest_id)
-                   .execute())
+        rows = [{**q, "done": 1 if q.get("done", False) else 0} if "done" in q else dict(q) for q in quests]
+        if get_quests_backend() != "supabase":
+            return mirror_write("upsert", {"rows": rows})
+        response = run_supabase(lambda client: client.table("quests").upsert(rows, on_conflict="id").execute())
+        invalidate_quest_queries()
         return True
     except Exception as e:
-        st.error(f"Error updating quest: {e}")
+        st.error(f"Error saving quests: {e}")
         return False
 
-def delete_quest(quest_id):
-    """Delete a quest"""
+def update_quests(quest_ids, changes):
+    """Apply the same changes to many quests in one request"""
+    if not quest_ids:
+        return True
     try:
-        response = (supabase.table("quests")
-                   .delete()
-                   .eq("id", quest_id)
-                   .execute())
+        changes = dict(changes)
+        if "done" in changes:
+            changes["done"] = 1 if changes["done"] else 0
+        if get_quests_backend() != "supabase":
+            return mirror_write("update", {"ids": list(quest_ids), "changes": changes})
+        response = run_supabase(lambda client: client.table("quests")
+                                .update(changes)
+                                .in_("id", list(quest_ids))
+                                .execute())
+        invalidate_quest_queries()
         return True
     except Exception as e:
-        st.error(f"Error deleting quest: {e}")
+        st.error(f"Error updating quests: {e}")
         return False
+
+def delete_quests(quest_ids):
+    """Delete many quests in one request, leaving tombstones for delta sync"""
+    if not quest_ids:
+        return True
+    try:
+        if get_quests_backend() != "supabase":
+            return mirror_write("delete", {"ids": list(quest_ids)})
+        response = run_supabase(lambda client: client.table("quests")
+                                .update({"deleted": 1})
+                                .in_("id", list(quest_ids))
+                                .execute())
+        invalidate_quest_queries()
+        return True
+    except Exception as e:
+        st.error(f"Error deleting quests: {e}")
+        return False
+
+def parse_quest_import(uploaded_file, created_by):
+    """Read quests from a CSV/Excel sheet, returns (quests, errors)
+
+    Needs name, description, deadline and owner columns; done and id are optional.
+    Rows without an id get one derived from the file and row number, so
+    importing the same sheet twice updates the quests instead of duplicating them.
+    """
+    file_hash = hash_upload(uploaded_file.getvalue())
+    if uploaded_file.name.lower().endswith(".csv"):
+        sheet = pd.read_csv(uploaded_file, dtype=str)
+    else:
+        sheet = pd.read_excel(uploaded_file, dtype=str)
+    sheet.columns = sheet.columns.str.strip().str.lower()
+
+    missing = [c for c in ["name", "description", "deadline", "owner"] if c not in sheet.columns]
+    if missing:
+        return [], [f"Missing columns: {', '.join(missing)}"]
+
+    owners = ["Sajad", "Romina", "Melika", "Fatemeh"]
+    deadlines = pd.to_datetime(sheet["deadline"], errors="coerce", format="mixed")
+    quests = []
+    errors = []
+    for i, row in enumerate(sheet.fillna("").to_dict("records")):
+        line = i + 2
+        if not row["name"].strip():
+            errors.append(f"Row {line}: missing name")
+        elif pd.isna(deadlines.iloc[i]):
+            errors.append(f"Row {line}: invalid deadline '{row['deadline']}'")
+        elif row["owner"].strip() not in owners:
+            errors.append(f"Row {line}: unknown owner '{row['owner']}'")
+        else:
+            quests.append({
+                "id": row.get("id", "").strip() or str(uuid.uuid5(uuid.NAMESPACE_URL, f"{file_hash}:{line}")),
+                "name": row["name"].strip(),
+                "description": row["description"].strip(),
+                "deadline": str(deadlines.iloc[i].date()),
+                "owner": row["owner"].strip(),
+                "done": row.get("done", "").strip().lower() in ["1", "true", "yes", "done"],
+                "created_by": created_by,
+                "created_at": str(date.today())
+            })
+    return quests, errors
+
+# ======================
+# QUEST STATISTICS
+# ======================
+# Grouped counts come from this Supabase function when it exists:
+#   create or replace function quest_stats(today date)
+#   returns table (owner text, done smallint, overdue boolean, quests bigint)
+#   language sql stable as $$
+#     select owner, done, done = 0 and deadline::date < today, count(*)
+#     from quests where deleted = 0 group by 1, 2, 3
+#   $$;
+# Without it the counts fall back to head-only count queries.
+
+def summarize_quest_counts(rows):
+    """Fold (owner, done, overdue, quests) rows into per-owner done/pending/overdue counts"""
+    stats = {}
+    for owner, done, overdue, count in rows:
+        counts = stats.setdefault(owner, {"done": 0, "pending": 0, "overdue": 0})
+        counts["done" if done else "pending"] += count
+        if overdue:
+            counts["overdue"] += count
+    return stats
+
+def count_quests(client, **filters):
+    """Number of live quests matching eq/lt filters, without fetching any rows"""
+    query = client.table("quests").select("id", count="exact", head=True).eq("deleted", 0)
+    for column, value in filters.items():
+        if column == "deadline_before":
+            query = query.lt("deadline", value)
+        else:
+            query = query.eq(column, value)
+    return query.execute().count or 0
+
+def fetch_quest_counts_fallback(today):
+    """Grouped counts from parallel head-only count queries, one set per owner"""
+    futures = {}
+    for owner in ["Sajad", "Romina", "Melika", "Fatemeh"]:
+        futures[(owner, 1, False)] = submit_supabase(lambda client, o=owner: count_quests(client, owner=o, done=1))
+        futures[(owner, 0, None)] = submit_supabase(lambda client, o=owner: count_quests(client, owner=o, done=0))
+        futures[(owner, 0, True)] = submit_supabase(
+            lambda client, o=owner: count_quests(client, owner=o, done=0, deadline_before=today)
+        )
+    counts = {key: wait_supabase(future) for key, future in futures.items()}
+    rows = []
+    for (owner, done, overdue), count in counts.items():
+        if overdue is None:
+            # Pending quests that are not overdue
+            overdue, count = False, count - counts[(owner, 0, True)]
+        if count:
+            rows.append((owner, done, overdue, count))
+    return rows
+
+def fetch_quest_counts(today):
+    """Grouped quest counts from the quest_stats function, or the head-query fallback"""
+    cache = get_quest_cache()
+    if cache.get("stats_rpc", True):
+        try:
+            response = wait_supabase(submit_supabase(
+                lambda client: client.rpc("quest_stats", {"today": today}).execute(), retries=0
+            ))
+            return [(r["owner"], r["done"], r["overdue"], r["quests"]) for r in response.data]
+        except Exception as e:
+            # PostgREST answers PGRST202 / 404 when the function is not deployed;
+            # anything else may be transient, so keep using the function
+            if str(getattr(e, "code", None)) not in ["PGRST202", "404"]:
+                raise
+            cache["stats_rpc"] = False
+    return fetch_quest_counts_fallback(today)
+
+def load_quest_stats():
+    """Per-owner done/pending/overdue quest counts; only aggregates are transferred
+
+    Cached with the quest query pages, so any write refreshes it.
+    """
+    today = str(date.today())
+    if get_quests_backend() != "supabase":
+        return summarize_quest_counts(mirror_quest_counts(today))
+
+    cache = get_quest_cache()
+    key = ("stats", today)
+    with cache["lock"]:
+        cached = cache["queries"].get(key)
+        if cached is not None and time.monotonic() - cached[0] < QUEST_CACHE_TTL_SECONDS:
+            return cached[1]
+
+    try:
+        stats = summarize_quest_counts(fetch_quest_counts(today))
+    except Exception as e:
+        st.error(f"Error loading quest statistics: {e}")
+        return {}
+
+    with cache["lock"]:
+        cache["queries"][key] = (time.monotonic(), stats)
+    return stats
+
+# ======================
+# LOCAL QUEST MIRROR
+# ======================
+QUEST_COLUMNS = ["id", "name", "description", "deadline", "owner", "done", "created_by", "created_at", "updated_at"]
+
+QUEST_SYNC_POLL_SECONDS = 5
+
+QUEST_SYNC_MAX_ATTEMPTS = 8
+
+QUEST_MIRROR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quests (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    description TEXT,
+    deadline TEXT,
+    owner TEXT,
+    done INTEGER NOT NULL DEFAULT 0,
+    created_by TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_quests_owner_deadline ON quests (owner, deadline);
+CREATE INDEX IF NOT EXISTS idx_quests_deadline ON quests (deadline, id);
+CREATE TABLE IF NOT EXISTS quest_outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS quest_sync (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def get_quests_backend():
+    """Quest storage from secrets: mirror (SQLite synced to Supabase, default), supabase or local"""
+    return st.secrets.get("QUESTS_BACKEND", "mirror")
+
+def get_quest_mirror_file():
+    """Get SQLite quest mirror path"""
+    return os.path.join(get_data_dir(), "quests.sqlite")
+
+def connect_quest_mirror():
+    """Open the quest mirror, creating its tables on first use"""
+    conn = sqlite3.connect(get_quest_mirror_file(), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(QUEST_MIRROR_SCHEMA)
+    # Mirrors created before delta sync lack updated_at
+    if "updated_at" not in [c["name"] for c in conn.execute("PRAGMA table_info(quests)")]:
+        conn.execute("ALTER TABLE quests ADD COLUMN updated_at TEXT")
+    return conn
+
+def mirror_query_quests(owner=None, done=None, deadline_from=None, deadline_to=None,
+                        columns="*", page=0, page_size=None):
+    """One page of matching quests from the mirror, returns (quests, total_count)"""
+    if columns != "*":
+        columns = ", ".join(c.strip() for c in columns.split(",") if c.strip() in QUEST_COLUMNS)
+    where = []
+    params = []
+    if owner is not None:
+        where.append("owner = ?")
+        params.append(owner)
+    if done is not None:
+        where.append("done = ?")
+        params.append(1 if done else 0)
+    if deadline_from is not None:
+        where.append("deadline >= ?")
+        params.append(str(deadline_from))
+    if deadline_to is not None:
+        where.append("deadline <= ?")
+        params.append(str(deadline_to))
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    conn = connect_quest_mirror()
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM quests {where_sql}", params).fetchone()[0]
+        sql = f"SELECT {columns} FROM quests {where_sql} ORDER BY deadline, id"
+        if page_size:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [page_size, page * page_size]
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    return [normalize_quest(dict(r)) for r in rows], total
+
+def mirror_quest_counts(today):
+    """Grouped (owner, done, overdue, quests) counts from the mirror"""
+    conn = connect_quest_mirror()
+    try:
+        return conn.execute(
+            "SELECT owner, done, done = 0 AND deadline < ?, COUNT(*) FROM quests GROUP BY 1, 2, 3", (today,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+def apply_quest_change(conn, op, payload):
+    """Apply an upsert/update/delete payload to the mirror tables"""
+    if op == "upsert":
+        for row in payload["rows"]:
+            cols = [c for c in QUEST_COLUMNS if c in row]
+            updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c != "id")
+            conn.execute(
+                f"INSERT INTO quests ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                f"ON CONFLICT(id) DO {'UPDATE SET ' + updates if updates else 'NOTHING'}",
+                [row[c] for c in cols]
+            )
+    elif op == "update":
+        cols = [c for c in QUEST_COLUMNS if c in payload["changes"] and c != "id"]
+        if cols:
+            conn.executemany(
+                f"UPDATE quests SET {', '.join(f'{c} = ?' for c in cols)} WHERE id = ?",
+                [[payload["changes"][c] for c in cols] + [quest_id] for quest_id in payload["ids"]]
+            )
+    elif op == "delete":
+        conn.executemany("DELETE FROM quests WHERE id = ?", [(quest_id,) for quest_id in payload["ids"]])
+    else:
+        raise ValueError(f"Unknown quest change: {op}")
+
+def mirror_write(op, payload):
+    """Apply a change to the mirror and queue it for Supabase in one transaction"""
+    conn = connect_quest_mirror()
+    try:
+        with conn:
+            apply_quest_change(conn, op, payload)
+            if get_quests_backend() == "mirror":
+                conn.execute("INSERT INTO quest_outbox (op, payload) VALUES (?, ?)",
+                             (op, json.dumps(payload, default=str)))
+    finally:
+        conn.close()
+    if get_quests_backend() == "mirror":
+        get_quest_sync_worker()["wake"].set()
+    return True
+
+def push_quest_change(client, op, payload):
+    """Send one outbox entry to Supabase; upserts resolve conflicts on id"""
+    table = client.table("quests")
+    if op == "upsert":
+        table.upsert(payload["rows"], on_conflict="id").execute()
+    elif op == "update":
+        table.update(payload["changes"]).in_("id", payload["ids"]).execute()
+    elif op == "delete":
+        table.update({"deleted": 1}).in_("id", payload["ids"]).execute()
+    else:
+        raise ValueError(f"Unknown quest change: {op}")
+
+def flush_quest_outbox(client):
+    """Push pending outbox entries in order, backing off on failure
+
+    Entries that keep failing are parked as failed so they do not block
+    later changes. Their rows may never change on Supabase again, so
+    parking also drops the watermark and the next pull reloads every
+    quest, restoring the Supabase version of the mirror.
+    """
+    conn = connect_quest_mirror()
+    try:
+        while True:
+            entry = conn.execute(
+                "SELECT * FROM quest_outbox WHERE status = 'pending' ORDER BY seq LIMIT 1"
+            ).fetchone()
+            if entry is None or entry["next_attempt"] > time.time():
+                return
+            try:
+                payload = json.loads(entry["payload"])
+                # The outbox has its own backoff, so no immediate retries here
+                call_supabase(lambda c: push_quest_change(c, entry["op"], payload), client, retries=0)
+            except SupabaseUnavailable:
+                return
+            except Exception as e:
+                attempts = entry["attempts"] + 1
+                with conn:
+                    conn.execute(
+                        "UPDATE quest_outbox SET attempts = ?, last_error = ?, next_attempt = ?, status = ? "
+                        "WHERE seq = ?",
+                        (attempts, str(e), time.time() + min(2 ** attempts, 300),
+                         "failed" if attempts >= QUEST_SYNC_MAX_ATTEMPTS else "pending", entry["seq"])
+                    )
+                    if attempts >= QUEST_SYNC_MAX_ATTEMPTS:
+                        conn.execute("DELETE FROM quest_sync WHERE key = 'watermark'")
+                if attempts < QUEST_SYNC_MAX_ATTEMPTS:
+                    return
+                continue
+            with conn:
+                conn.execute("DELETE FROM quest_outbox WHERE seq = ?", (entry["seq"],))
+    finally:
+        conn.close()
+
+def pull_quests(client):
+    """Patch the mirror with Supabase rows changed since the last pull
+
+    The first pull copies every live quest. Returns False without touching
+    the mirror while local changes are pending.
+    """
+    conn = connect_quest_mirror()
+    try:
+        pending = "SELECT COUNT(*) FROM quest_outbox WHERE status = 'pending'"
+        if conn.execute(pending).fetchone()[0]:
+            return False
+        watermark = conn.execute("SELECT value FROM quest_sync WHERE key = 'watermark'").fetchone()
+        since = watermark[0] if watermark else None
+        changes = call_supabase(lambda c: fetch_quest_changes(c, since), client)
+        # Re-check under the write lock so a write made during the fetch is not lost
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute(pending).fetchone()[0]:
+            conn.rollback()
+            return False
+        if since is None:
+            conn.execute("DELETE FROM quests")
+        apply_quest_change(conn, "upsert", {"rows": [
+            {**q, "done": 1 if q.get("done") else 0} for q in changes if not q.get("deleted")
+        ]})
+        apply_quest_change(conn, "delete", {"ids": [q["id"] for q in changes if q.get("deleted")]})
+        watermark = quest_watermark(changes, since)
+        if watermark:
+            conn.execute("INSERT OR REPLACE INTO quest_sync VALUES ('watermark', ?)", (watermark,))
+        conn.execute("INSERT OR REPLACE INTO quest_sync VALUES ('last_pull', ?)", (datetime.now().isoformat(),))
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+def run_quest_sync(state, client):
+    """Sync loop: push the outbox, then refresh the mirror every quest TTL"""
+    while True:
+        try:
+            if supabase_breaker_open():
+                raise SupabaseUnavailable("Supabase is not responding, sync paused")
+            flush_quest_outbox(client)
+            if time.monotonic() - state["last_pull"] >= QUEST_CACHE_TTL_SECONDS:
+                if pull_quests(client):
+                    state["last_pull"] = time.monotonic()
+            state["last_error"] = None
+        except Exception as e:
+            state["last_error"] = str(e)
+        state["wake"].wait(QUEST_SYNC_POLL_SECONDS)
+        state["wake"].clear()
+
+@st.cache_resource
+def get_quest_sync_worker():
+    """Start the background thread that keeps the mirror and Supabase in sync"""
+    state = {"wake": threading.Event(), "last_pull": 0.0, "last_error": None}
+    threading.Thread(target=run_quest_sync, args=(state, init_supabase()), daemon=True, name="quest-sync").start()
+    return state
+
+def ensure_quest_mirror():
+    """Start syncing and fill an empty mirror from Supabase before its first read"""
+    if get_quests_backend() != "mirror":
+        return
+    state = get_quest_sync_worker()
+    conn = connect_quest_mirror()
+    try:
+        synced = conn.execute("SELECT 1 FROM quest_sync WHERE key = 'last_pull'").fetchone()
+    finally:
+        conn.close()
+    if synced is None:
+        try:
+            if wait_supabase(get_supabase_pool().submit(pull_quests, init_supabase())):
+                state["last_pull"] = time.monotonic()
+        except Exception as e:
+            st.error(f"Error loading quests: {e}")
+
+def get_quest_sync_status():
+    """Pending and failed outbox counts, last error and last pull time"""
+    conn = connect_quest_mirror()
+    try:
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM quest_outbox GROUP BY status").fetchall())
+        error = conn.execute(
+            "SELECT last_error FROM quest_outbox WHERE last_error IS NOT NULL ORDER BY seq DESC LIMIT 1"
+        ).fetchone()
+        last_pull = conn.execute("SELECT value FROM quest_sync WHERE key = 'last_pull'").fetchone()
+    finally:
+        conn.close()
+    return {
+        "pending": counts.get("pending", 0),
+        "failed": counts.get("failed", 0),
+        "error": error[0] if error else get_quest_sync_worker()["last_error"],
+        "last_pull": last_pull[0] if last_pull else None
+    }
+
+def retry_failed_quest_changes():
+    """Queue failed outbox entries for another round of attempts"""
+    conn = connect_quest_mirror()
+    try:
+        with conn:
+            conn.execute("UPDATE quest_outbox SET status = 'pending', attempts = 0, next_attempt = 0 "
+                         "WHERE status = 'failed'")
+    finally:
+        conn.close()
+    get_quest_sync_worker()["wake"].set()
 # ======================
 # CUSTOM CSS
 # ======================
@@ -136,35 +860,6 @@ st.markdown("""
         border-left: 5px solid #3B82F6;
     }
     
-    .quest-card {
-        background-color: #ffffff;
-        padding: 1.5rem;
-        border-radius: 10px;
-        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.08);
-        margin-bottom: 1rem;
-        border-left: 5px solid #10B981;
-    }
-    
-    .success-badge {
-        background-color: #10B981;
-        color: white;
-        padding: 0.4rem 1rem;
-        border-radius: 20px;
-        font-size: 0.875rem;
-        display: inline-block;
-        font-weight: 600;
-    }
-    
-    .pending-badge {
-        background-color: #F59E0B;
-        color: white;
-        padding: 0.4rem 1rem;
-        border-radius: 20px;
-        font-size: 0.875rem;
-        display: inline-block;
-        font-weight: 600;
-    }
-    
     .stButton>button {
         width: 100%;
         border-radius: 8px;
@@ -254,8 +949,11 @@ if "current_user" not in st.session_state:
 if "is_authenticated" not in st.session_state:
     st.session_state.is_authenticated = False
 
-if "df_clean" not in st.session_state:
-    st.session_state.df_clean = None
+if "dataset_key" not in st.session_state:
+    st.session_state.dataset_key = None
+
+if "kpi_cube" not in st.session_state:
+    st.session_state.kpi_cube = None
 
 if "holidays" not in st.session_state:
     st.session_state.holidays = []
@@ -272,12 +970,12 @@ if "trend_filters" not in st.session_state:
 if "show_upload_modal" not in st.session_state:
     st.session_state.show_upload_modal = False
 
-if "editing_quest" not in st.session_state:
-    st.session_state.editing_quest = None
-
 if "quest_created" not in st.session_state:
     st.session_state.quest_created = False
 
+if "quest_import_round" not in st.session_state:
+    st.session_state.quest_import_round = 0
+
 # ======================
 # DATA STORAGE FOR HOLIDAYS
 # ======================
@@ -325,14 +1023,46 @@ if "holidays_loaded" not in st.session_state:
 # ======================
 # HELPER FUNCTIONS
 # ======================
-def jalali_to_gregorian(val):
-    try:
-        if pd.isna(val):
-            return None
-        y, m, d = map(int, str(val).split("/"))
-        return jdatetime.date(y, m, d).togregorian()
-    except:
-        return None
+# Day offset of the first day of each Jalali month from 1 Farvardin
+JALALI_MONTH_STARTS = (0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336)
+JALALI_MONTH_DAYS = (31, 31, 31, 31, 31, 31, 30, 30, 30, 30, 30, 29)
+UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def jalali_year_table(first_year, last_year):
+    """Gregorian ordinal of 1 Farvardin and leap flag for each Jalali year in range"""
+    years = range(first_year, last_year + 1)
+    starts = np.array([jdatetime.date(y, 1, 1).togregorian().toordinal() for y in years])
+    leaps = np.array([jdatetime.date(y, 1, 1).isleap() for y in years])
+    return starts, leaps
+
+def jalali_to_gregorian(values):
+    """Convert a Series of Jalali "YYYY/MM/DD" strings to datetime64, NaT when invalid"""
+    codes, uniques = pd.factorize(values)
+    result = np.full(len(uniques), np.datetime64("NaT"), dtype="datetime64[D]")
+
+    parts = pd.Series(uniques, dtype=object).astype(str).str.strip().str.extract(
+        r"^(\d{1,4})/(\d{1,2})/(\d{1,2})$"
+    )
+    valid = parts.notna().all(axis=1).to_numpy()
+    if valid.any():
+        y, m, d = parts[valid].astype(int).to_numpy().T
+        valid_parts = (y >= 1) & (y <= jdatetime.MAXYEAR) & (m >= 1) & (m <= 12) & (d >= 1)
+        y, m, d = y[valid_parts], m[valid_parts], d[valid_parts]
+        if len(y):
+            first_year = y.min()
+            starts, leaps = jalali_year_table(first_year, y.max())
+            month_days = np.take(JALALI_MONTH_DAYS, m - 1) + ((m == 12) & leaps[y - first_year])
+            in_month = d <= month_days
+            ordinals = starts[y - first_year] + np.take(JALALI_MONTH_STARTS, m - 1) + d - 1
+            converted = np.full(len(y), np.datetime64("NaT"), dtype="datetime64[D]")
+            converted[in_month] = (ordinals[in_month] - UNIX_EPOCH_ORDINAL).astype("datetime64[D]")
+            positions = np.flatnonzero(valid)[valid_parts]
+            result[positions] = converted
+
+    gregorian = np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[D]")
+    present = codes >= 0
+    gregorian[present] = result[codes[present]]
+    return pd.Series(pd.to_datetime(gregorian), index=values.index)
 
 def normalize_customer(val):
     if pd.isna(val):
@@ -358,36 +1088,138 @@ def normalize_designer(val):
     }
     return mapping.get(str(val).strip(), val)
 
+def normalize_categorical(series, normalize):
+    """Normalize each distinct value once and return a categorical column"""
+    mapping = {val: normalize(val) for val in series.dropna().unique()}
+    return series.map(mapping).astype("category")
+
+# Expected workbook columns: output name -> accepted Persian headers
+EXCEL_COLUMNS = {
+    "Brief Number": ["شماره بریف"],
+    "Designer Name": ["نام طراح"],
+    "Customer": ["درخواست کننده", "درخواست‌کننده"],
+    "Deadline - date": ["تاریخ ددلاین"],
+    "Hour": ["ساعت ددلاین"],
+    "Type": ["نوع کاور"],
+    "Edit count": ["تعداد ویرایش"],
+    "Reason": ["علت ویرایش"],
+    "Submission date": ["زمان ثبت بریف - تاریخ"],
+    "Submission hour": ["زمان ثبت بریف - ساعت"]
+}
+
+# Text columns are read as strings up front instead of being inferred
+EXCEL_DTYPES = {
+    "Brief Number": str,
+    "Designer Name": str,
+    "Customer": str,
+    "Deadline - date": str,
+    "Hour": str,
+    "Type": str,
+    "Reason": str
+}
+
+# Rows per chunk in streaming mode, and upload size from which it is used
+EXCEL_CHUNK_ROWS = 5000
+EXCEL_STREAMING_MIN_BYTES = 5 * 1024 * 1024
+
+class ExcelSchemaError(ValueError):
+    """Uploaded workbook is missing expected columns"""
+
+class DatasetSaveError(RuntimeError):
+    """Cleaned upload could not be written to disk"""
+
+def resolve_excel_columns(headers):
+    """Map the workbook's own headers to output column names, failing on missing ones"""
+    stripped = {str(header).strip(): header for header in headers}
+    columns = {}
+    missing = []
+    for name, candidates in EXCEL_COLUMNS.items():
+        header = next((stripped[c] for c in candidates if c in stripped), None)
+        if header is None:
+            missing.append(f"{candidates[0]} ({name})")
+        else:
+            columns[header] = name
+    if missing:
+        raise ExcelSchemaError(f"Missing expected columns: {', '.join(missing)}")
+    return columns
+
 def clean_excel(uploaded_file):
-    df = pd.read_excel(uploaded_file)
-    df.columns = df.columns.str.strip()
-
-    drop_letters = ["B","E","F","G","H","I","L","R","S","T","U"]
-    drop_indexes = [
-        ord(l) - ord("A")
-        for l in drop_letters
-        if ord(l) - ord("A") < len(df.columns)
-    ]
-    df.drop(df.columns[drop_indexes], axis=1, inplace=True)
-
-    rename_map = {
-        "شماره بریف": "Brief Number",
-        "نام طراح": "Designer Name",
-        "درخواست کننده": "Customer",
-        "درخواست‌کننده": "Customer",
-        "تاریخ ددلاین": "Deadline - date",
-        "ساعت ددلاین": "Hour",
-        "نوع کاور": "Type",
-        "تعداد ویرایش": "Edit count",
-        "علت ویرایش": "Reason",
-        "زمان ثبت بریف - تاریخ": "Submission date",
-        "زمان ثبت بریف - ساعت": "Submission hour"
-    }
+    # Read only the header row first so a wrong export fails before parsing any data
+    columns = resolve_excel_columns(pd.read_excel(uploaded_file, nrows=0).columns)
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
 
-    df = df.rename(columns=lambda x: rename_map.get(x, x))
-    df["Designer Name"] = df["Designer Name"].apply(normalize_designer)
-    df["Customer"] = df["Customer"].apply(normalize_customer)
-    df["Deadline - date"] = df["Deadline - date"].apply(jalali_to_gregorian)
+    df = pd.read_excel(
+        uploaded_file,
+        usecols=list(columns),
+        dtype={header: EXCEL_DTYPES[name] for header, name in columns.items() if name in EXCEL_DTYPES}
+    )
+    df = df.rename(columns=columns)[list(EXCEL_COLUMNS)]
+    return clean_frame(df)
+
+def clean_excel_streaming(uploaded_file, progress=None, chunk_rows=None):
+    """Clean a workbook chunk by chunk with openpyxl's read-only mode
+
+    Peak memory is bounded by the chunk size instead of the sheet size;
+    progress, if given, is called with (rows_done, total_rows or None).
+    """
+    chunk_rows = chunk_rows or EXCEL_CHUNK_ROWS
+    workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        headers = next(rows, ())
+        columns = resolve_excel_columns([h for h in headers if h is not None])
+        positions = [headers.index(header) for header in columns]
+        names = list(columns.values())
+        total_rows = sheet.max_row - 1 if sheet.max_row else None
+
+        chunks = []
+        buffer = []
+        rows_done = 0
+        for row in rows:
+            if not any(value is not None for value in row):
+                continue
+            buffer.append([row[i] if i < len(row) else None for i in positions])
+            if len(buffer) >= chunk_rows:
+                chunks.append(clean_chunk(buffer, names))
+                rows_done += len(buffer)
+                buffer = []
+                if progress:
+                    progress(rows_done, total_rows)
+        if buffer or not chunks:
+            chunks.append(clean_chunk(buffer, names))
+            rows_done += len(buffer)
+        if progress:
+            progress(rows_done, rows_done)
+    finally:
+        workbook.close()
+
+    return concat_clean_chunks(chunks)
+
+def clean_chunk(rows, names):
+    """Clean one chunk of raw worksheet rows"""
+    df = pd.DataFrame(rows, columns=names)
+    for name in EXCEL_DTYPES:
+        df[name] = df[name].map(str, na_action="ignore")
+    return clean_frame(df[list(EXCEL_COLUMNS)])
+
+def concat_clean_chunks(chunks):
+    """Stack cleaned chunks column by column, unioning categorical categories"""
+    columns = {}
+    for name in chunks[0].columns:
+        parts = [chunk[name] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[name] = pd.Series(pd.api.types.union_categoricals(parts))
+        else:
+            columns[name] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+def clean_frame(df):
+    """Normalize a frame whose columns already carry the output names"""
+    df["Designer Name"] = normalize_categorical(df["Designer Name"], normalize_designer)
+    df["Customer"] = normalize_categorical(df["Customer"], normalize_customer)
+    df["Deadline - date"] = jalali_to_gregorian(df["Deadline - date"])
 
     replace_map = {
         "سبز": "Ghorme Sabzi",
@@ -402,14 +1234,160 @@ def clean_excel(uploaded_file):
     }
 
     for col in ["Type", "Reason"]:
-        df[col] = df[col].replace(replace_map)
+        df[col] = normalize_categorical(df[col], lambda val: replace_map.get(val, val))
 
     df["Submission date"] = pd.to_datetime(df["Submission date"], errors="coerce")
-    df["Submission hour"] = pd.to_datetime(df["Submission hour"], errors="coerce").dt.time
+
+    # Minute of day instead of datetime.time objects keeps the late check vectorized
+    submission_time = pd.to_datetime(df.pop("Submission hour"), errors="coerce")
+    df["Submission minute"] = (submission_time.dt.hour * 60 + submission_time.dt.minute).astype("Int16")
 
     return df
 
+# ======================
+# SHARED DATASET STORE
+# ======================
+# Bump when clean_excel output changes so stale cache files are ignored
+CLEAN_CACHE_VERSION = 5
+DATASET_STORE_MAX_ENTRIES = 4
+
+@st.cache_resource
+def get_dataset_store():
+    """Process-wide LRU of cleaned datasets keyed by upload content hash
+
+    Entries are shared by every session and must be treated as read-only.
+    """
+    return {"datasets": OrderedDict(), "lock": threading.Lock()}
+
+def get_datasets_dir():
+    """Get or create cleaned dataset storage directory"""
+    datasets_dir = os.path.join(get_data_dir(), "datasets")
+    if not os.path.exists(datasets_dir):
+        os.makedirs(datasets_dir)
+    return datasets_dir
+
+def get_cache_file(content_hash):
+    """Get parquet file path for a cleaned upload"""
+    return os.path.join(get_datasets_dir(), f"clean_v{CLEAN_CACHE_VERSION}_{content_hash}.parquet")
+
+def hash_upload(data):
+    """Content hash of the uploaded workbook bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def store_dataset(content_hash, df):
+    """Register a cleaned dataset and its base KPI cube, evicting the least recently used"""
+    entry = {"df": df, "cube": build_kpi_cube(df)}
+    store = get_dataset_store()
+    with store["lock"]:
+        store["datasets"][content_hash] = entry
+        store["datasets"].move_to_end(content_hash)
+        while len(store["datasets"]) > DATASET_STORE_MAX_ENTRIES:
+            store["datasets"].popitem(last=False)
+    return entry
+
+def get_dataset_entry(content_hash):
+    """Shared dataset entry, reloaded from the disk cache if it was evicted"""
+    if content_hash is None:
+        return None
+
+    store = get_dataset_store()
+    with store["lock"]:
+        entry = store["datasets"].get(content_hash)
+        if entry is not None:
+            store["datasets"].move_to_end(content_hash)
+            return entry
+
+    cache_file = get_cache_file(content_hash)
+    if os.path.exists(cache_file):
+        try:
+            return store_dataset(content_hash, pd.read_parquet(cache_file, memory_map=True))
+        except Exception:
+            # Corrupt or unreadable cache file, treat as missing
+            pass
+    return None
+
+def ingest_excel(uploaded_file, make_progress=None):
+    """Clean an uploaded workbook once per content version and return its dataset key
+
+    Large workbooks go through the bounded-memory streaming reader;
+    make_progress, if given, is called only then to get its progress
+    callback, so cache hits and small files show no progress bar. The
+    parquet file is what keeps the upload across restarts, so it is written
+    before the dataset is stored and a failed write raises DatasetSaveError.
+    """
+    data = uploaded_file.getvalue()
+    content_hash = hash_upload(data)
+    if get_dataset_entry(content_hash) is not None:
+        return content_hash
+
+    if len(data) >= EXCEL_STREAMING_MIN_BYTES:
+        df = clean_excel_streaming(BytesIO(data), progress=make_progress() if make_progress else None)
+    else:
+        df = clean_excel(BytesIO(data))
+
+    cache_file = get_cache_file(content_hash)
+    tmp_file = f"{cache_file}.{uuid.uuid4().hex}.tmp"
+    try:
+        df.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise DatasetSaveError(f"Could not save the processed file: {e}") from e
+
+    store_dataset(content_hash, df)
+    return content_hash
+
+@st.cache_resource
+def get_manifest_lock():
+    """Serializes manifest updates across sessions"""
+    return threading.Lock()
+
+def get_manifest_file():
+    """Get dataset manifest file path"""
+    return os.path.join(get_data_dir(), "datasets.json")
+
+def load_dataset_manifest():
+    """Load stored dataset versions, oldest first"""
+    manifest_file = get_manifest_file()
+    if not os.path.exists(manifest_file):
+        return []
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        st.error(f"Error loading dataset versions: {e}")
+        return []
+
+def record_dataset_version(dataset_key, uploaded_by):
+    """Add a dataset to the manifest unless it already is the latest version"""
+    with get_manifest_lock():
+        versions = load_dataset_manifest()
+        if versions and versions[-1]["key"] == dataset_key:
+            return versions[-1]
+
+        version = {
+            "version": versions[-1]["version"] + 1 if versions else 1,
+            "key": dataset_key,
+            "uploaded_at": datetime.now().isoformat(timespec="seconds"),
+            "uploaded_by": uploaded_by,
+            "rows": len(get_dataset_entry(dataset_key)["df"])
+        }
+        versions.append(version)
+
+        manifest_file = get_manifest_file()
+        tmp_file = f"{manifest_file}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(versions, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, manifest_file)
+        except Exception as e:
+            st.error(f"Error saving dataset version: {e}")
+        return version
+
+@st.cache_resource(max_entries=256)
 def pie_chart(title, value, total, color):
+    """KPI donut, built once per (title, value, total, color) and shared; do not modify"""
     fig = px.pie(
         names=[title, "Others"],
         values=[value, max(total - value, 0)],
@@ -426,34 +1404,442 @@ def pie_chart(title, value, total, color):
     )
     return fig
 
+@st.cache_resource(max_entries=64)
+def pie_charts(slices):
+    """All donuts of a KPI panel in one figure; slices is a tuple of (title, value, total, color)"""
+    rows = -(-len(slices) // 3)
+    fig = plotly_subplots.make_subplots(rows=rows, cols=3, specs=[[{"type": "domain"}] * 3] * rows,
+                                        subplot_titles=[title for title, _, _, _ in slices])
+    for i, (title, value, total, color) in enumerate(slices):
+        fig.add_trace(go.Pie(
+            labels=[title, "Others"],
+            values=[value, max(total - value, 0)],
+            hole=0.45,
+            marker_colors=[color, "#ECECEC"],
+            textinfo="percent+value",
+            pull=[0.07, 0]
+        ), row=i // 3 + 1, col=i % 3 + 1)
+    fig.update_layout(
+        showlegend=False,
+        height=320 * rows,
+        margin=dict(l=20, r=20, t=40, b=20),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+# ======================
+# KPI REGISTRY
+# ======================
+LATE_MINUTE = 18 * 60
+
+def is_late(df, holidays):
+    """Submitted at or after 18:00, or on a holiday"""
+    after_hours = df["Submission minute"].ge(LATE_MINUTE).to_numpy(dtype=bool, na_value=False)
+    on_holiday = df["Submission date"].dt.normalize().isin(pd.to_datetime(list(holidays)))
+    return on_holiday | after_hours
+
+# Each KPI is declared once: display metadata, a vectorized row flag and
+# the equivalent SQL condition for the SQLite backend
+KPI_REGISTRY = {
+    "Ghorme Sabzi": {
+        "emoji": "🥬", "color": "#2ECC71", "label": "Ghorme Sabzi", "chart_label": "Ghorme Sabzi",
+        "flag": lambda df, holidays: df["Type"] == "Ghorme Sabzi",
+        "sql": "type = 'Ghorme Sabzi'"
+    },
+    "Omlet": {
+        "emoji": "🥚", "color": "#F1C40F", "label": "Omlet", "chart_label": "Omlet",
+        "flag": lambda df, holidays: df["Type"] == "Omlet",
+        "sql": "type = 'Omlet'"
+    },
+    "Burger": {
+        "emoji": "🍔", "color": "#E67E22", "label": "Burger", "chart_label": "Burger",
+        "flag": lambda df, holidays: df["Type"] == "Burger",
+        "sql": "type = 'Burger'"
+    },
+    "Error Rate": {
+        "emoji": "❌", "color": "#E74C3C", "label": "Designer Error", "chart_label": "Designer Error",
+        "flag": lambda df, holidays: df["Reason"].isin(["Designer Error", "Team-lead: Designer Error"]),
+        "sql": "reason IN ('Designer Error', 'Team-lead: Designer Error')"
+    },
+    "Edits > 2": {
+        "emoji": "🔁", "color": "#8E44AD", "label": "Edits > 2", "chart_label": "2+ Revisions",
+        "flag": lambda df, holidays: df["Edit count"] >= 2,
+        "sql": "edit_count >= 2"
+    },
+    "Late Submissions": {
+        "emoji": "⏰", "color": "#34495E", "label": "Late Submissions", "chart_label": "Late",
+        "flag": lambda df, holidays: is_late(df, holidays),
+        "holidays": True,
+        "sql": f"submission_minute >= {LATE_MINUTE} OR submission_date IN (SELECT day FROM holidays)"
+    }
+}
+
 def get_kpi_options():
     return {
-        "Ghorme Sabzi": {"emoji": "🥬", "color": "#2ECC71"},
-        "Omlet": {"emoji": "🥚", "color": "#F1C40F"},
-        "Burger": {"emoji": "🍔", "color": "#E67E22"},
-        "Error Rate": {"emoji": "❌", "color": "#E74C3C"},
-        "Edits > 2": {"emoji": "🔁", "color": "#8E44AD"},
-        "Late Submissions": {"emoji": "⏰", "color": "#34495E"}
+        name: {"emoji": kpi["emoji"], "color": kpi["color"]}
+        for name, kpi in KPI_REGISTRY.items()
     }
 
-def calculate_kpi(df, kpi_name, holidays):
-    if kpi_name == "Ghorme Sabzi":
-        return (df["Type"] == "Ghorme Sabzi").sum()
-    elif kpi_name == "Omlet":
-        return (df["Type"] == "Omlet").sum()
-    elif kpi_name == "Burger":
-        return (df["Type"] == "Burger").sum()
-    elif kpi_name == "Error Rate":
-        return df["Reason"].isin(["Designer Error", "Team-lead: Designer Error"]).sum()
-    elif kpi_name == "Edits > 2":
-        return (df["Edit count"] >= 2).sum()
-    elif kpi_name == "Late Submissions":
-        late_condition = (df["Submission hour"] >= time(18, 0)) | (df["Submission date"].dt.date.isin(holidays))
-        return df[late_condition].shape[0]
-    return 0
-
-def create_trend_chart(df_all, kpi_name, time_range, holidays, designers=None):
-    """Create multi-line chart for trend analysis"""
+def kpi_flags(df, holidays, kpis=None):
+    """Boolean flag column per KPI, plus a Total column counting every row"""
+    kpis = list(KPI_REGISTRY) if kpis is None else kpis
+    flags = {"Total": pd.Series(1, index=df.index)}
+    for name in kpis:
+        flags[name] = KPI_REGISTRY[name]["flag"](df, holidays)
+    return pd.DataFrame(flags, index=df.index)
+
+def aggregate_kpis(df, holidays, by, kpis=None):
+    """Count KPIs over any grouping in a single groupby().sum()
+
+    by maps index level names to Series aligned with df, e.g. designer, day or month.
+    """
+    flags = kpi_flags(df, holidays, kpis)
+    keys = [series.rename(name) for name, series in by.items()]
+    return flags.groupby(keys, dropna=False, observed=True).sum()
+
+# ======================
+# DAILY KPI CUBE
+# ======================
+# Rows without a designer still count towards the Team
+UNASSIGNED_DESIGNER = "Unassigned"
+
+def build_kpi_cube(df):
+    """Materialize designer x day KPI counts for a cleaned dataset
+
+    Built without holidays, so Late Submissions starts out as the after-hours
+    count; that count is kept in "After hours" for apply_cube_holidays.
+    """
+    cube = aggregate_kpis(df, [], {
+        "day": df["Submission date"].dt.floor("D"),
+        "Designer Name": df["Designer Name"]
+    }).reset_index()
+    cube = cube[cube["day"].notna()]
+    # Plain labels so the Team row/column can be added next to designers
+    cube["Designer Name"] = cube["Designer Name"].astype(object).fillna(UNASSIGNED_DESIGNER)
+    cube = cube.set_index(["day", "Designer Name"]).sort_index()
+    cube["After hours"] = cube["Late Submissions"]
+    return cube
+
+def apply_cube_holidays(cube, added=(), removed=()):
+    """Update the Late Submissions slice of the given days in place"""
+    days = cube.index.get_level_values("day")
+    if added:
+        on_holiday = days.isin(pd.to_datetime(list(added)))
+        cube.loc[on_holiday, "Late Submissions"] = cube.loc[on_holiday, "Total"]
+    if removed:
+        off_holiday = days.isin(pd.to_datetime(list(removed)))
+        cube.loc[off_holiday, "Late Submissions"] = cube.loc[off_holiday, "After hours"]
+
+def upload_progress(slot):
+    """Progress bar callback for the streaming Excel reader, drawn in slot"""
+    bar = slot.progress(0.0)
+
+    def update(rows_done, total_rows):
+        if total_rows:
+            bar.progress(min(rows_done / total_rows, 1.0), text=f"{rows_done:,} / {total_rows:,} rows")
+        else:
+            bar.progress(0.0, text=f"{rows_done:,} rows")
+
+    return update
+
+def set_dataset(dataset_key):
+    """Point the session at a shared dataset"""
+    st.session_state.dataset_key = dataset_key
+    st.session_state.kpi_cube = None
+
+def has_dataset():
+    """Whether the session has a dataset, lazily opening the latest stored version"""
+    if get_dataset_entry(st.session_state.dataset_key) is not None:
+        return True
+    for version in reversed(load_dataset_manifest()):
+        if get_dataset_entry(version["key"]) is not None:
+            set_dataset(version["key"])
+            return True
+    st.session_state.dataset_key = None
+    return False
+
+def use_uploaded_dataset(uploaded_file):
+    """Ingest an upload, record it as a new version and make it the session dataset"""
+    progress_slot = st.empty()
+    try:
+        dataset_key = ingest_excel(uploaded_file, make_progress=lambda: upload_progress(progress_slot))
+    finally:
+        # Drop the bar once ingestion ends, whether it finished or failed
+        progress_slot.empty()
+    record_dataset_version(dataset_key, st.session_state.current_user)
+    set_dataset(dataset_key)
+
+def get_kpi_cube():
+    """Session copy of the dataset's KPI cube with the current holidays applied incrementally"""
+    state = st.session_state.kpi_cube
+    if state is None or state["key"] != st.session_state.dataset_key:
+        entry = get_dataset_entry(st.session_state.dataset_key)
+        state = {"key": st.session_state.dataset_key, "cube": entry["cube"].copy(), "holidays": set()}
+        st.session_state.kpi_cube = state
+
+    holidays = set(st.session_state.holidays)
+    added = holidays - state["holidays"]
+    removed = state["holidays"] - holidays
+    if added or removed:
+        apply_cube_holidays(state["cube"], added, removed)
+        state["holidays"] = holidays
+    return state["cube"]
+
+def cube_kpi_table(cube, start_date, end_date):
+    """Designer x KPI counts, plus the Team row, for a date range of the cube"""
+    period = cube.loc[pd.to_datetime(start_date):pd.to_datetime(end_date)]
+    table = period.groupby(level="Designer Name", dropna=False).sum()
+    table.loc["Team"] = table.sum()
+    return table.drop(columns="After hours")
+
+def cube_daily_series(cube, kpi_name):
+    """Daily KPI values and row counts with one column per designer plus Team"""
+    daily_values = cube[kpi_name].unstack("Designer Name", fill_value=0)
+    daily_rows = cube["Total"].unstack("Designer Name", fill_value=0)
+    daily_values["Team"] = daily_values.sum(axis=1)
+    daily_rows["Team"] = daily_rows.sum(axis=1)
+    return daily_values, daily_rows
+
+# ======================
+# SQLITE ANALYTICS BACKEND
+# ======================
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    dataset_key TEXT PRIMARY KEY,
+    row_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS submissions (
+    dataset_key TEXT NOT NULL,
+    designer TEXT,
+    submission_date TEXT NOT NULL,
+    submission_minute INTEGER,
+    type TEXT,
+    reason TEXT,
+    edit_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_designer_date
+    ON submissions (dataset_key, designer, submission_date);
+CREATE INDEX IF NOT EXISTS idx_submissions_date
+    ON submissions (dataset_key, submission_date);
+"""
+
+def get_analytics_backend():
+    """Analytics backend from secrets: cube (in-memory, default) or sqlite"""
+    return st.secrets.get("ANALYTICS_BACKEND", "cube")
+
+def get_analytics_db_file():
+    """Get SQLite analytics database path"""
+    return os.path.join(get_data_dir(), "analytics.sqlite")
+
+def connect_analytics_db(holidays=()):
+    """Open the analytics database with the given holidays in a temp table"""
+    conn = sqlite3.connect(get_analytics_db_file(), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SQLITE_SCHEMA)
+    conn.execute("CREATE TEMP TABLE holidays (day TEXT PRIMARY KEY)")
+    conn.executemany("INSERT OR IGNORE INTO holidays VALUES (?)", [(str(d),) for d in holidays])
+    conn.commit()
+    return conn
+
+def load_dataset_into_sqlite(dataset_key):
+    """Copy a dataset's rows into the submissions table once, shared by all processes"""
+    conn = connect_analytics_db()
+    try:
+        if conn.execute("SELECT 1 FROM datasets WHERE dataset_key = ?", (dataset_key,)).fetchone():
+            return
+
+        df = get_dataset_entry(dataset_key)["df"]
+        df = df[df["Submission date"].notna()]
+        rows = pd.DataFrame({
+            "dataset_key": dataset_key,
+            "designer": df["Designer Name"].astype(object),
+            "submission_date": df["Submission date"].dt.strftime("%Y-%m-%d"),
+            "submission_minute": df["Submission minute"].astype(object),
+            "type": df["Type"].astype(object),
+            "reason": df["Reason"].astype(object),
+            "edit_count": df["Edit count"].astype(object)
+        })
+        rows = rows.astype(object).where(rows.notna(), None)
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Another process may have loaded it while we were waiting for the lock
+            if not conn.execute("SELECT 1 FROM datasets WHERE dataset_key = ?", (dataset_key,)).fetchone():
+                conn.executemany(
+                    "INSERT INTO submissions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows.itertuples(index=False, name=None)
+                )
+                conn.execute("INSERT INTO datasets VALUES (?, ?)", (dataset_key, len(rows)))
+    finally:
+        conn.close()
+
+def kpi_sum_columns(kpis):
+    """SELECT list counting rows and each KPI condition"""
+    sums = [f'SUM(CASE WHEN {KPI_REGISTRY[name]["sql"]} THEN 1 ELSE 0 END) AS "{name}"' for name in kpis]
+    return ", ".join(['COUNT(*) AS "Total"'] + sums)
+
+def sqlite_date_bounds(dataset_key):
+    """First and last submission day of a dataset"""
+    load_dataset_into_sqlite(dataset_key)
+    conn = connect_analytics_db()
+    try:
+        first, last = conn.execute(
+            "SELECT MIN(submission_date), MAX(submission_date) FROM submissions WHERE dataset_key = ?",
+            (dataset_key,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return pd.to_datetime(first), pd.to_datetime(last)
+
+def sqlite_kpi_table(dataset_key, start_date, end_date, holidays):
+    """Designer x KPI counts, plus the Team row, from an indexed range query"""
+    load_dataset_into_sqlite(dataset_key)
+    conn = connect_analytics_db(holidays)
+    try:
+        table = pd.read_sql_query(
+            f"""SELECT COALESCE(designer, ?) AS "Designer Name", {kpi_sum_columns(KPI_REGISTRY)}
+                FROM submissions
+                WHERE dataset_key = ? AND submission_date BETWEEN ? AND ?
+                GROUP BY designer""",
+            conn,
+            params=(UNASSIGNED_DESIGNER, dataset_key, str(start_date), str(end_date)),
+            index_col="Designer Name"
+        )
+    finally:
+        conn.close()
+    table.loc["Team"] = table.sum()
+    return table
+
+def sqlite_daily_series(dataset_key, kpi_name, holidays):
+    """Daily KPI values and row counts with one column per designer plus Team"""
+    load_dataset_into_sqlite(dataset_key)
+    conn = connect_analytics_db(holidays)
+    try:
+        daily = pd.read_sql_query(
+            f"""SELECT submission_date AS day, COALESCE(designer, ?) AS "Designer Name",
+                       {kpi_sum_columns([kpi_name])}
+                FROM submissions
+                WHERE dataset_key = ?
+                GROUP BY submission_date, designer""",
+            conn,
+            params=(UNASSIGNED_DESIGNER, dataset_key),
+            parse_dates=["day"],
+            index_col=["day", "Designer Name"]
+        )
+    finally:
+        conn.close()
+    return cube_daily_series(daily, kpi_name)
+
+# ======================
+# ANALYTICS QUERIES
+# ======================
+def get_date_bounds():
+    """First and last submission day of the session dataset"""
+    if get_analytics_backend() == "sqlite":
+        return sqlite_date_bounds(st.session_state.dataset_key)
+    cube_days = get_kpi_cube().index.get_level_values("day")
+    return cube_days.min(), cube_days.max()
+
+def get_kpi_table(start_date, end_date):
+    """Designer x KPI counts for a date range of the session dataset"""
+    if get_analytics_backend() == "sqlite":
+        return sqlite_kpi_table(st.session_state.dataset_key, start_date, end_date, st.session_state.holidays)
+    return cube_kpi_table(get_kpi_cube(), start_date, end_date)
+
+def get_daily_series(kpi_name):
+    """Daily values and row counts of a KPI per designer for the session dataset"""
+    def build():
+        if get_analytics_backend() == "sqlite":
+            return sqlite_daily_series(st.session_state.dataset_key, kpi_name, st.session_state.holidays)
+        return cube_daily_series(get_kpi_cube(), kpi_name)
+    return cached_trend_result(trend_cache_key("series", kpi_name), build)
+
+def get_trend_chart(kpi_name, time_range, designers, window=None):
+    """Trend figure for the session dataset, built once per view and shared"""
+    return cached_trend_result(
+        trend_cache_key("figure", kpi_name, time_range, tuple(designers), window),
+        lambda: create_trend_chart(get_daily_series(kpi_name), kpi_name, time_range,
+                                   designers=designers, window=window)
+    )
+
+# ======================
+# TREND RESULT CACHE
+# ======================
+TREND_CACHE_MAX_ENTRIES = 64
+
+@st.cache_resource
+def get_trend_cache():
+    """Process-wide LRU of daily series and trend figures
+
+    Keys carry the dataset content hash and, for KPIs that depend on
+    holidays, a hash of the holiday set, so a new upload or holiday edit
+    misses only the affected entries. Values are shared and read-only.
+    """
+    return {"entries": OrderedDict(), "lock": threading.Lock()}
+
+def trend_cache_key(kind, kpi_name, *parts):
+    """Trend cache key for the session dataset and, if the KPI uses them, holidays"""
+    holidays = None
+    if KPI_REGISTRY[kpi_name].get("holidays"):
+        holidays = hashlib.sha256(json.dumps(sorted(str(d) for d in st.session_state.holidays)).encode()).hexdigest()
+    return (kind, get_analytics_backend(), st.session_state.dataset_key, kpi_name, holidays) + parts
+
+def cached_trend_result(key, build):
+    """Cached value for key, calling build() and evicting the least recently used on a miss"""
+    cache = get_trend_cache()
+    with cache["lock"]:
+        if key in cache["entries"]:
+            cache["entries"].move_to_end(key)
+            return cache["entries"][key]
+    value = build()
+    with cache["lock"]:
+        cache["entries"][key] = value
+        cache["entries"].move_to_end(key)
+        while len(cache["entries"]) > TREND_CACHE_MAX_ENTRIES:
+            cache["entries"].popitem(last=False)
+    return value
+
+# ======================
+# TREND CHART
+# ======================
+
+TREND_MAX_POINTS = 1200  # per line, about one point per pixel of a wide chart
+
+TREND_WEBGL_POINTS = 1000
+
+def lttb(y, n_out):
+    """Indices of n_out evenly spaced points picked by Largest-Triangle-Three-Buckets
+
+    Keeps the first and last point and, from each bucket, the point that
+    forms the largest triangle with the previous pick and the next
+    bucket's average, so peaks and dips survive downsampling.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    picked = np.empty(n_out, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+def create_trend_chart(daily_series, kpi_name, time_range, designers=None, window=None):
+    """Create multi-line chart for trend analysis
+
+    "Daily" plots every day in window (all history by default); lines
+    longer than TREND_MAX_POINTS are downsampled with LTTB and large
+    charts are drawn with WebGL.
+    """
     kpi_options = get_kpi_options()
     emoji = kpi_options[kpi_name]["emoji"]
     
@@ -474,67 +1860,66 @@ def create_trend_chart(df_all, kpi_name, time_range, holidays, designers=None):
     else:
         designers_to_show = designers
     
+    # Daily KPI value and row count for every designer
+    daily_values, daily_rows = daily_series
+    
     for designer in designers_to_show:
-        # Filter data for each designer
-        if designer == "Team":
-            df_designer = df_all
-            display_name = "Team"
-        else:
-            df_designer = df_all[df_all["Designer Name"] == designer]
-            display_name = designer
+        display_name = designer
         
-        if df_designer.empty:
+        if designer not in daily_rows.columns:
             continue
         
-        # Prepare data
-        df = df_designer.copy()
+        active_days = daily_rows.index[daily_rows[designer] > 0]
+        if active_days.empty:
+            continue
+        end_date = active_days.max()
         
         if time_range == "Monthly":
-            # Daily trend for last 30 days
-            end_date = df["Submission date"].max()
+            # Daily trend for the last 30 days of this designer's data
             start_date = end_date - pd.Timedelta(days=30)
-            df_period = df[df["Submission date"] >= start_date]
+            days = pd.date_range(start_date, end_date, freq="D")
+            values = daily_values[designer].reindex(days, fill_value=0)
             
-            if df_period.empty:
+            designer_df = pd.DataFrame({
+                "date": days.date,
+                "value": values.to_numpy(),
+                "designer": display_name,
+                "time_label": days.strftime("%Y-%m-%d")
+            })
+            all_data.append(designer_df)
+        
+        elif time_range == "Daily":
+            # Every day between the designer's first and last submission, limited to the window
+            start_date = active_days.min()
+            if window is not None:
+                start_date = max(start_date, pd.Timestamp(window[0]))
+                end_date = min(end_date, pd.Timestamp(window[1]))
+            days = pd.date_range(start_date, end_date, freq="D")
+            if days.empty:
                 continue
+            values = daily_values[designer].reindex(days, fill_value=0).to_numpy()
+            keep = lttb(values, TREND_MAX_POINTS)
             
-            # Group by day
-            daily_data = []
-            current_date = start_date.date()
-            
-            while current_date <= end_date.date():
-                day_data = df_period[df_period["Submission date"].dt.date == current_date]
-                value = calculate_kpi(day_data, kpi_name, holidays)
-                daily_data.append({
-                    "date": current_date,
-                    "value": value,
-                    "designer": display_name,
-                    "time_label": current_date.strftime("%Y-%m-%d")
-                })
-                current_date += pd.Timedelta(days=1)
-            
-            if daily_data:
-                designer_df = pd.DataFrame(daily_data)
-                all_data.append(designer_df)
+            all_data.append(pd.DataFrame({
+                "value": values[keep],
+                "designer": display_name,
+                "time_label": days[keep]
+            }))
         
         else:  # Annually or All time
-            # Create year_month column for grouping
-            df["year_month"] = df["Submission date"].dt.to_period("M")
-            
             if time_range == "Annually":
-                end_date = df["Submission date"].max()
                 start_date = end_date - pd.DateOffset(months=11)
-                df_period = df[df["Submission date"] >= start_date]
+                in_period = daily_rows.index >= start_date
             else:  # All time
-                df_period = df
+                in_period = slice(None)
             
-            if df_period.empty:
-                continue
-            
-            # Group by month
-            monthly_stats = df_period.groupby("year_month").apply(
-                lambda x: calculate_kpi(x, kpi_name, holidays)
-            ).reset_index(name="value")
+            # Roll the daily counts up to months that have data
+            period = pd.DataFrame({
+                "value": daily_values[designer][in_period],
+                "rows": daily_rows[designer][in_period]
+            })
+            monthly_stats = period.groupby(period.index.to_period("M").rename("year_month")).sum()
+            monthly_stats = monthly_stats[monthly_stats["rows"] > 0].drop(columns="rows").reset_index()
             
             monthly_stats["designer"] = display_name
             monthly_stats["time_label"] = monthly_stats["year_month"].dt.strftime("%Y-%m")
@@ -549,6 +1934,7 @@ def create_trend_chart(df_all, kpi_name, time_range, holidays, designers=None):
     
     # Create multi-line chart
     title = f"{emoji} {kpi_name} Trend"
+    webgl = len(combined_df) > TREND_WEBGL_POINTS
     
     fig = px.line(
         combined_df,
@@ -556,9 +1942,10 @@ def create_trend_chart(df_all, kpi_name, time_range, holidays, designers=None):
         y="value",
         color="designer",
         title=title,
-        markers=True,
+        markers=not webgl,
         color_discrete_map=color_palette,
-        line_shape="linear"  # خطوط مستقیم
+        line_shape="linear",  # خطوط مستقیم
+        render_mode="webgl" if webgl else "svg"
     )
     
     # Chart styling - لجند کاملاً ترنسپرنت
@@ -616,9 +2003,10 @@ def create_trend_chart(df_all, kpi_name, time_range, holidays, designers=None):
     )
     
     fig.update_traces(
-        line=dict(width=3),
+        line=dict(width=2 if webgl else 3),
         marker=dict(size=8),
-        hovertemplate='<b>%{x}</b><br>Count: %{y}<extra></extra>'
+        hovertemplate=('<b>%{x|%Y-%m-%d}</b>' if time_range == "Daily" else '<b>%{x}</b>')
+                      + '<br>Count: %{y}<extra></extra>'
     )
     
     return fig
@@ -703,19 +2091,64 @@ def render_sidebar():
             st.session_state.current_user = None
             st.session_state.is_authenticated = False
             st.session_state.active_page = "landing"
-            st.session_state.df_clean = None
+            st.session_state.dataset_key = None
+            st.session_state.kpi_cube = None
             st.session_state.holidays = []
             st.rerun()
 
 # ======================
 # KPI PAGE
 # ======================
+@st.fragment
+def render_kpi_panel(start_date, end_date, panels):
+    """KPIs of the designer picked in the selector
+
+    Only the picked panel is built and sent; switching designers reruns
+    just this fragment, not the page.
+    """
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        panel = st.radio("KPI view", options=list(panels), horizontal=True, label_visibility="collapsed")
+    with col2:
+        single_chart = st.toggle("🧩 Single chart", help="Draw the six donuts as one figure")
+    designer = panels[panel]
+    
+    # All KPIs for all designers in the date range in a single query
+    kpi_table = get_kpi_table(start_date, end_date)
+    title = "Team" if designer is None else designer
+    total = kpi_table.at[title, "Total"] if title in kpi_table.index else 0
+    
+    if total == 0:
+        st.warning(f"⚠️ No data found for {title} in this period")
+        return
+    
+    # Display KPIs in two rows of three
+    kpi_row = kpi_table.loc[title]
+    kpi_names = list(KPI_REGISTRY)
+    total = int(total)
+    for row_start in range(0, len(kpi_names), 3):
+        cols = st.columns(3)
+        for col, kpi_name in zip(cols, kpi_names[row_start:row_start + 3]):
+            kpi = KPI_REGISTRY[kpi_name]
+            value = int(kpi_row[kpi_name])
+            with col:
+                st.metric(f"{kpi['emoji']} {kpi['label']}", f"{value}", f"{value/total*100:.1f}%")
+                if not single_chart:
+                    fig = pie_chart(kpi["chart_label"], value, total, kpi["color"])
+                    st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+    
+    if single_chart:
+        fig = pie_charts(tuple(
+            (KPI_REGISTRY[k]["chart_label"], int(kpi_row[k]), total, KPI_REGISTRY[k]["color"]) for k in kpi_names
+        ))
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+
 def render_kpi_page():
     """KPI Page"""
     st.markdown('<h1 class="main-header">📊 KPI Dashboard</h1>', unsafe_allow_html=True)
     
     # Show upload section if no data exists
-    if st.session_state.df_clean is None:
+    if not has_dataset():
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             st.markdown("### 📁 Upload Excel File")
@@ -725,21 +2158,40 @@ def render_kpi_page():
             
             if uploaded_file is not None:
                 with st.spinner("🔄 Processing file..."):
-                    st.session_state.df_clean = clean_excel(uploaded_file)
-                    st.success("✅ File uploaded and processed successfully!")
-                    st.rerun()
+                    try:
+                        use_uploaded_dataset(uploaded_file)
+                    except (ExcelSchemaError, DatasetSaveError) as e:
+                        st.error(f"❌ {e}")
+                    else:
+                        st.success("✅ File uploaded and processed successfully!")
+                        st.rerun()
         return
     
     # If data exists, show KPI
-    df_all = st.session_state.df_clean.copy()
+    # Stored dataset versions
+    versions = load_dataset_manifest()
+    current = next((v for v in versions if v["key"] == st.session_state.dataset_key), None)
+    if current:
+        st.caption(f"🗂️ Dataset v{current['version']} · uploaded by {current['uploaded_by']} "
+                   f"on {current['uploaded_at'].replace('T', ' ')} · {current['rows']:,} rows")
+    if len(versions) > 1:
+        with st.expander("🗂️ Dataset Versions"):
+            labels = {f"v{v['version']} · {v['uploaded_at'].replace('T', ' ')} · {v['uploaded_by']}": v["key"]
+                      for v in reversed(versions)}
+            selected_version = st.selectbox("Version", options=list(labels))
+            if st.button("📂 Open Version", use_container_width=True):
+                if get_dataset_entry(labels[selected_version]) is not None:
+                    set_dataset(labels[selected_version])
+                    st.rerun()
+                else:
+                    st.error("❌ This version is no longer available")
     
     # Date range and holiday settings
     st.markdown("### ⚙️ Settings")
     col1, col2 = st.columns(2)
     
     with col1:
-        min_d = df_all["Submission date"].min()
-        max_d = df_all["Submission date"].max()
+        min_d, max_d = get_date_bounds()
         start_date, end_date = st.date_input(
             "📅 Analysis Period",
             value=(min_d, max_d),
@@ -769,78 +2221,14 @@ def render_kpi_page():
     if st.session_state.holidays:
         st.info(f"📋 Current Holidays: {', '.join([str(d) for d in st.session_state.holidays])}")
     
-    # Filter data based on date range
-    df_filtered = df_all[
-        (df_all["Submission date"] >= pd.to_datetime(start_date)) &
-        (df_all["Submission date"] <= pd.to_datetime(end_date))
-    ]
-    
-    # Tabs for different designers
+    # Panels for different designers
     if st.session_state.current_user == "Sajad":
-        tab_names = ["Team KPI", "Sajad KPI", "Romina KPI", "Melika KPI", "Fatemeh KPI"]
-        tab_designers = [None, "Sajad", "Romina", "Melika", "Fatemeh"]
+        panels = {"Team KPI": None, "Sajad KPI": "Sajad", "Romina KPI": "Romina",
+                  "Melika KPI": "Melika", "Fatemeh KPI": "Fatemeh"}
     else:
-        tab_names = ["Team KPI", f"{st.session_state.current_user} KPI"]
-        tab_designers = [None, st.session_state.current_user]
+        panels = {"Team KPI": None, f"{st.session_state.current_user} KPI": st.session_state.current_user}
     
-    tabs = st.tabs([f"**{name}**" for name in tab_names])
-    
-    for idx, (tab, designer) in enumerate(zip(tabs, tab_designers)):
-        with tab:
-            if designer is None:
-                df_to_show = df_filtered
-                title = "Team"
-            else:
-                df_to_show = df_filtered[df_filtered["Designer Name"] == designer]
-                title = designer
-            
-            total = len(df_to_show)
-            
-            if total == 0:
-                st.warning(f"⚠️ No data found for {title} in this period")
-                continue
-            
-            # Calculate KPIs
-            ghorme = (df_to_show["Type"] == "Ghorme Sabzi").sum()
-            omlet = (df_to_show["Type"] == "Omlet").sum()
-            burger = (df_to_show["Type"] == "Burger").sum()
-            designer_error = df_to_show["Reason"].isin(["Designer Error", "Team-lead: Designer Error"]).sum()
-            revision_2 = (df_to_show["Edit count"] >= 2).sum()
-            late = df_to_show[(df_to_show["Submission hour"] >= time(18, 0)) | 
-                              (df_to_show["Submission date"].dt.date.isin(st.session_state.holidays))].shape[0]
-            
-            # Display KPIs in two rows
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("🥬 Ghorme Sabzi", f"{ghorme}", f"{ghorme/total*100:.1f}%")
-                fig1 = pie_chart("Ghorme Sabzi", ghorme, total, "#2ECC71")
-                st.plotly_chart(fig1, use_container_width=True, config={'displayModeBar': False})
-            
-            with col2:
-                st.metric("🥚 Omlet", f"{omlet}", f"{omlet/total*100:.1f}%")
-                fig2 = pie_chart("Omlet", omlet, total, "#F1C40F")
-                st.plotly_chart(fig2, use_container_width=True, config={'displayModeBar': False})
-            
-            with col3:
-                st.metric("🍔 Burger", f"{burger}", f"{burger/total*100:.1f}%")
-                fig3 = pie_chart("Burger", burger, total, "#E67E22")
-                st.plotly_chart(fig3, use_container_width=True, config={'displayModeBar': False})
-            
-            col4, col5, col6 = st.columns(3)
-            with col4:
-                st.metric("❌ Designer Error", f"{designer_error}", f"{designer_error/total*100:.1f}%")
-                fig4 = pie_chart("Designer Error", designer_error, total, "#E74C3C")
-                st.plotly_chart(fig4, use_container_width=True, config={'displayModeBar': False})
-            
-            with col5:
-                st.metric("🔁 Edits > 2", f"{revision_2}", f"{revision_2/total*100:.1f}%")
-                fig5 = pie_chart("2+ Revisions", revision_2, total, "#8E44AD")
-                st.plotly_chart(fig5, use_container_width=True, config={'displayModeBar': False})
-            
-            with col6:
-                st.metric("⏰ Late Submissions", f"{late}", f"{late/total*100:.1f}%")
-                fig6 = pie_chart("Late", late, total, "#34495E")
-                st.plotly_chart(fig6, use_container_width=True, config={'displayModeBar': False})
+    render_kpi_panel(start_date, end_date, panels)
     
     # Re-upload button at bottom
     st.markdown("---")
@@ -891,10 +2279,14 @@ def render_kpi_page():
                 with col_btn1:
                     if st.button("✅ Confirm", use_container_width=True):
                         if new_file is not None:
-                            st.session_state.df_clean = clean_excel(new_file)
-                            st.session_state.show_upload_modal = False
-                            st.success("✅ New file uploaded successfully!")
-                            st.rerun()
+                            try:
+                                use_uploaded_dataset(new_file)
+                            except (ExcelSchemaError, DatasetSaveError) as e:
+                                st.error(f"❌ {e}")
+                            else:
+                                st.session_state.show_upload_modal = False
+                                st.success("✅ New file uploaded successfully!")
+                                st.rerun()
                 
                 with col_btn2:
                     if st.button("❌ Cancel", use_container_width=True):
@@ -906,50 +2298,180 @@ def render_kpi_page():
 # ======================
 # QUESTS PAGE
 # ======================
-def render_quest_edit_form(quest):
-    """Render quest edit form"""
-    st.markdown(f"### ✏️ Edit Quest: {quest['name']}")
+def quest_grid_frame(quests, columns):
+    """Quests as a DataFrame indexed by id, with deadlines as dates for the grid"""
+    df = pd.DataFrame(quests, columns=["id"] + columns).set_index("id")
+    df["deadline"] = pd.to_datetime(df["deadline"], errors="coerce").dt.date
+    if "description" in df:
+        df["description"] = df["description"].fillna("")
+    df["done"] = df["done"].fillna(False).astype(bool)
+    return df
+
+def quest_column_config():
+    """Column labels and editors shared by the quest grids"""
+    return {
+        "name": st.column_config.TextColumn("📝 Quest Name", required=True),
+        "description": st.column_config.TextColumn("📋 Description"),
+        "deadline": st.column_config.DateColumn("📅 Deadline", required=True),
+        "owner": st.column_config.SelectboxColumn("👤 Owner", options=["Sajad", "Romina", "Melika", "Fatemeh"],
+                                                  required=True),
+        "done": st.column_config.CheckboxColumn("✅ Completed"),
+        "created_by": st.column_config.TextColumn("Created by"),
+        "delete": st.column_config.CheckboxColumn("🗑️ Delete")
+    }
+
+def render_quest_grid(quests, grid_key):
+    """Editable grid of quests; all edits and deletes are saved as one batch"""
+    fields = ["name", "description", "deadline", "owner", "done"]
+    original = quest_grid_frame(quests, fields)
+    original["delete"] = False
+    edited = st.data_editor(original, key=grid_key, hide_index=True, use_container_width=True,
+                            column_config=quest_column_config())
     
-    name = st.text_input("📝 Quest Name", value=quest["name"])
-    description = st.text_area("📋 Description", value=quest["description"])
-    deadline = st.date_input("📅 Deadline", value=date.fromisoformat(quest["deadline"]))
-    owner = st.selectbox("👤 Assign to", ["Sajad", "Romina", "Melika", "Fatemeh"], 
-                        index=["Sajad", "Romina", "Melika", "Fatemeh"].index(quest["owner"]))
-    done = st.checkbox("✅ Mark as completed", value=quest["done"])
+    changed = edited[fields].ne(original[fields]).any(axis=1) & ~edited["delete"]
+    deleted = list(edited.index[edited["delete"]])
+    count = int(changed.sum()) + len(deleted)
     
     col1, col2 = st.columns(2)
     with col1:
-        if st.button("💾 Save Changes", type="primary", use_container_width=True):
-            # Update quest
-            updated_quest = {
-                "name": name,
-                "description": description,
-                "deadline": str(deadline),
-                "owner": owner,
-                "done": done
-            }
-            
-            if update_quest(quest["id"], updated_quest):
-                st.session_state.editing_quest = None
-                st.success("✅ Quest updated successfully!")
+        if st.button(f"💾 Save {count} changes", key=f"{grid_key}_save", type="primary",
+                     use_container_width=True, disabled=not count):
+            # Upserts send whole rows, so carry over the columns the grid does not show
+            created = {q["id"]: {"created_by": q["created_by"], "created_at": q["created_at"]} for q in quests}
+            rows = [{**created[quest_id], **row, "id": quest_id, "deadline": str(row["deadline"]),
+                     "done": bool(row["done"])}
+                    for quest_id, row in edited.loc[changed, fields].to_dict("index").items()]
+            if upsert_quests(rows) and delete_quests(deleted):
+                st.session_state.pop(grid_key, None)
+                st.success(f"✅ {count} quests saved")
                 st.rerun()
-    
     with col2:
-        if st.button("❌ Cancel", use_container_width=True):
-            st.session_state.editing_quest = None
+        if st.button("↩️ Discard changes", key=f"{grid_key}_discard", use_container_width=True, disabled=not count):
+            st.session_state.pop(grid_key, None)
             st.rerun()
 
+def render_quest_table(quests, columns):
+    """Read-only grid of quests"""
+    st.dataframe(quest_grid_frame(quests, columns), hide_index=True, use_container_width=True,
+                 column_config=quest_column_config())
+
+def query_quest_page(pager_key, **filters):
+    """Query the page picked in a quest list's pager, returns (quests, pages)"""
+    return query_quest_pages({pager_key: filters})[pager_key]
+
+def query_quest_pages(pagers):
+    """Query the picked page of several quest lists in parallel
+
+    pagers maps each pager key to its query_quests filters; returns
+    {pager_key: (quests, pages)}.
+    """
+    queries = {
+        key: {**filters, "page": st.session_state.get(key, 1) - 1, "page_size": QUEST_PAGE_SIZE}
+        for key, filters in pagers.items()
+    }
+    results = dict(zip(queries, query_quests_many(list(queries.values()))))
+    stale = {}
+    for key, (quests, total) in results.items():
+        pages = max(1, -(-total // QUEST_PAGE_SIZE))
+        if queries[key]["page"] >= pages:
+            # Filters changed and the old page no longer exists
+            st.session_state[key] = pages
+            stale[key] = {**queries[key], "page": pages - 1}
+    results.update(zip(stale, query_quests_many(list(stale.values()))))
+    return {key: (quests, max(1, -(-total // QUEST_PAGE_SIZE))) for key, (quests, total) in results.items()}
+
+def render_quest_pager(pager_key, pages):
+    """Page selector below a quest list"""
+    if pages > 1:
+        st.number_input(f"Page (1-{pages})", min_value=1, max_value=pages, step=1, key=pager_key)
+
+def render_bulk_quest_actions(quests):
+    """Multi-select actions on the listed quests, each applied in a single request"""
+    with st.expander("🧰 Bulk Actions"):
+        labels = {f"{q['name']} · {q['owner']} · {q['deadline']}": q["id"] for q in quests}
+        selected = st.multiselect("Select quests", options=list(labels), key="bulk_selected")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            action = st.selectbox("Action", ["✅ Mark as completed", "🔄 Mark as in progress",
+                                             "👤 Reassign owner", "🗑️ Delete"], key="bulk_action")
+        with col2:
+            new_owner = st.selectbox("New owner", ["Sajad", "Romina", "Melika", "Fatemeh"],
+                                     key="bulk_owner", disabled=action != "👤 Reassign owner")
+        
+        if st.button(f"⚡ Apply to {len(selected)} quests", use_container_width=True, disabled=not selected):
+            quest_ids = [labels[label] for label in selected]
+            if action == "✅ Mark as completed":
+                ok = update_quests(quest_ids, {"done": True})
+            elif action == "🔄 Mark as in progress":
+                ok = update_quests(quest_ids, {"done": False})
+            elif action == "👤 Reassign owner":
+                ok = update_quests(quest_ids, {"owner": new_owner})
+            else:
+                ok = delete_quests(quest_ids)
+            if ok:
+                st.success(f"✅ {len(quest_ids)} quests updated")
+                st.rerun()
+
+def render_quest_import():
+    """Create quests in bulk from an uploaded CSV/Excel sheet"""
+    with st.expander("📥 Import Quests from CSV/Excel"):
+        st.caption("Columns: name, description, deadline, owner (optional: done, id)")
+        # a fresh key empties the uploader once its quests are saved
+        import_key = f"quest_import_{st.session_state.quest_import_round}"
+        import_file = st.file_uploader("Choose quest sheet", type=["csv", "xlsx"], key=import_key)
+        if import_file is not None:
+            quests, errors = parse_quest_import(import_file, st.session_state.current_user)
+            for error in errors[:10]:
+                st.warning(f"⚠️ {error}")
+            if quests and st.button(f"📥 Import {len(quests)} quests", type="primary", use_container_width=True):
+                if upsert_quests(quests):
+                    st.session_state.quest_import_round += 1
+                    st.session_state.quest_created = True
+                    st.rerun()
+
+def render_quest_sync_status():
+    """Show changes that have not reached Supabase yet"""
+    status = get_quest_sync_status()
+    if status["pending"]:
+        st.caption(f"🔄 {status['pending']} change(s) waiting to sync")
+    if status["failed"]:
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.warning(f"⚠️ {status['failed']} change(s) could not be synced: {status['error']}")
+        with col2:
+            if st.button("🔁 Retry", key="retry_quest_sync", use_container_width=True):
+                retry_failed_quest_changes()
+                st.rerun()
+
+def render_quest_stats():
+    """Done, pending and overdue counts for the team, or for the current user"""
+    stats = load_quest_stats()
+    if st.session_state.current_user != "Sajad":
+        stats = {o: c for o, c in stats.items() if o == st.session_state.current_user}
+    totals = {k: sum(c[k] for c in stats.values()) for k in ["done", "pending", "overdue"]}
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("📜 Total Quests", totals["done"] + totals["pending"])
+    col2.metric("✅ Completed", totals["done"])
+    col3.metric("🔄 In Progress", totals["pending"])
+    col4.metric("⏰ Overdue", totals["overdue"])
+    
+    if st.session_state.current_user == "Sajad" and stats:
+        with st.expander("👥 Quests by owner"):
+            by_owner = pd.DataFrame.from_dict(stats, orient="index")
+            by_owner.columns = ["✅ Completed", "🔄 In Progress", "⏰ Overdue"]
+            st.dataframe(by_owner, use_container_width=True)
+
 def render_quests_page():
     """Quests Page"""
     st.markdown('<h1 class="main-header">🗡️ Quest Management</h1>', unsafe_allow_html=True)
     
-    # Check if editing a quest
-    if st.session_state.editing_quest is not None:
-        render_quest_edit_form(st.session_state.editing_quest)
-        return
+    ensure_quest_mirror()
+    if get_quests_backend() == "mirror":
+        render_quest_sync_status()
     
-    # Load quests from database
-    quests = load_quests()
+    render_quest_stats()
     
     # Show success message if quest was just created
     if st.session_state.quest_created:
@@ -989,104 +2511,63 @@ def render_quests_page():
                         st.rerun()
                 else:
                     st.error("❌ Please enter quest name and description")
+            
+            render_quest_import()
         
         with tab2:
             st.markdown("### 📋 All Quests")
             
-            filter_owner = st.selectbox("Filter by owner", 
-                                       ["All", "Sajad", "Romina", "Melika", "Fatemeh"])
+            col_owner, col_status = st.columns(2)
+            with col_owner:
+                filter_owner = st.selectbox("Filter by owner", 
+                                           ["All", "Sajad", "Romina", "Melika", "Fatemeh"])
+            with col_status:
+                filter_status = st.selectbox("Filter by status", ["All", "In Progress", "Completed"])
             
-            filtered_quests = quests if filter_owner == "All" else [q for q in quests if q["owner"] == filter_owner]
+            # My Quests renders on the same run, so both lists load together
+            quest_pages = query_quest_pages({
+                "all_quests_page": {
+                    "owner": None if filter_owner == "All" else filter_owner,
+                    "done": None if filter_status == "All" else filter_status == "Completed",
+                    "columns": "id,name,description,deadline,owner,done,created_by,created_at"
+                },
+                "my_quests_page": {"owner": "Sajad", "columns": "id,name,description,deadline,done"}
+            })
+            filtered_quests, pages = quest_pages["all_quests_page"]
             
             if not filtered_quests:
                 st.info("📭 No quests found")
             else:
-                for q in filtered_quests:
-                    with st.container():
-                        st.markdown('<div class="quest-card">', unsafe_allow_html=True)
-                        
-                        col1, col2, col3 = st.columns([3, 1, 1])
-                        with col1:
-                            st.markdown(f"#### {q['name']}")
-                            st.caption(q["description"])
-                            st.markdown(f"**📅 Deadline:** {q['deadline']} | **👤 Owner:** {q['owner']}")
-                        
-                        with col2:
-                            if q["done"]:
-                                st.markdown('<span class="success-badge">✅ Completed</span>', unsafe_allow_html=True)
-                            else:
-                                st.markdown('<span class="pending-badge">🔄 In Progress</span>', unsafe_allow_html=True)
-                        
-                        with col3:
-                            col_edit, col_del = st.columns(2)
-                            with col_edit:
-                                if st.button("✏️ Edit", key=f"edit_{q['id']}"):
-                                    st.session_state.editing_quest = q
-                                    st.rerun()
-                            
-                            with col_del:
-                                if st.button("🗑️", key=f"del_{q['id']}"):
-                                    if delete_quest(q["id"]):
-                                        st.success("✅ Quest deleted")
-                                        st.rerun()
-                        
-                        st.markdown('</div>', unsafe_allow_html=True)
+                render_bulk_quest_actions(filtered_quests)
+                grid_key = f"quest_grid_{filter_owner}_{filter_status}_{st.session_state.get('all_quests_page', 1)}"
+                render_quest_grid(filtered_quests, grid_key)
+                render_quest_pager("all_quests_page", pages)
         
         with tab3:
             st.markdown("### 🎯 My Quests")
-            my_quests = [q for q in quests if q["owner"] == "Sajad"]
+            my_quests, pages = quest_pages["my_quests_page"]
             
             if not my_quests:
                 st.info("📭 No quests assigned to you")
             else:
-                for q in my_quests:
-                    with st.container():
-                        st.markdown('<div class="quest-card">', unsafe_allow_html=True)
-                        
-                        st.markdown(f"#### {q['name']}")
-                        st.caption(q["description"])
-                        
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            st.markdown(f"**📅 Deadline:** {q['deadline']}")
-                        
-                        with col2:
-                            if q["done"]:
-                                st.markdown('<span class="success-badge">✅ Completed</span>', unsafe_allow_html=True)
-                            else:
-                                st.markdown('<span class="pending-badge">🔄 In Progress</span>', unsafe_allow_html=True)
-                        
-                        st.markdown('</div>', unsafe_allow_html=True)
+                render_quest_table(my_quests, ["name", "description", "deadline", "done"])
+                render_quest_pager("my_quests_page", pages)
     
     else:
         # Other users - Only their quests
         st.markdown(f"### 🎯 {st.session_state.current_user}'s Quests")
         
-        user_quests = [q for q in quests if q["owner"] == st.session_state.current_user]
+        user_quests, pages = query_quest_page(
+            "user_quests_page",
+            owner=st.session_state.current_user,
+            columns="id,name,description,deadline,done,created_by"
+        )
         
         if not user_quests:
             st.info("📭 No quests assigned to you")
         else:
-            for q in user_quests:
-                with st.container():
-                    st.markdown('<div class="quest-card">', unsafe_allow_html=True)
-                    
-                    st.markdown(f"#### {q['name']}")
-                    st.caption(q["description"])
-                    
-                    col1, col2 = st.columns([3, 1])
-                    with col1:
-                        st.markdown(f"**📅 Deadline:** {q['deadline']}")
-                        if "created_by" in q:
-                            st.caption(f"Created by: {q['created_by']}")
-                    
-                    with col2:
-                        if q["done"]:
-                            st.markdown('<span class="success-badge">✅ Completed</span>', unsafe_allow_html=True)
-                        else:
-                            st.markdown('<span class="pending-badge">🔄 In Progress</span>', unsafe_allow_html=True)
-                    
-                    st.markdown('</div>', unsafe_allow_html=True)
+            render_quest_table(user_quests, ["name", "description", "deadline", "done", "created_by"])
+            render_quest_pager("user_quests_page", pages)
 
 # ======================
 # TREND PAGE
@@ -1095,12 +2576,10 @@ def render_trend_page():
     """Trend Analysis Page"""
     st.markdown('<h1 class="main-header">📈 Trend Analysis</h1>', unsafe_allow_html=True)
     
-    if st.session_state.df_clean is None:
+    if not has_dataset():
         st.warning("⚠️ Please upload an Excel file from the KPI page first")
         return
     
-    df_all = st.session_state.df_clean.copy()
-    
     # Filters container
     with st.container():
         st.markdown("### ⚙️ Filters")
@@ -1116,7 +2595,7 @@ def render_trend_page():
             st.session_state.trend_filters["selected_kpi"] = selected_kpi
         
         with col2:
-            time_options = ["Monthly", "Annually", "All time"]
+            time_options = ["Monthly", "Annually", "All time", "Daily"]
             selected_time = st.selectbox(
                 "📅 Time Range",
                 options=time_options,
@@ -1143,15 +2622,24 @@ def render_trend_page():
     else:
         designers_to_show = ["Team"]
     
-    # Create and display chart
-    holidays = st.session_state.holidays
+    # Plotly zoom does not reach the server, so a narrower window is picked here
+    # and is drawn at full resolution once it fits TREND_MAX_POINTS days
+    window = None
+    if st.session_state.trend_filters["time_range"] == "Daily":
+        min_d, max_d = (pd.Timestamp(d).date() for d in get_date_bounds())
+        if min_d < max_d:
+            window = st.slider("🔍 Zoom window", min_value=min_d, max_value=max_d,
+                               value=(min_d, max_d), format="YYYY-MM-DD")
+        if window is not None and (window[1] - window[0]).days >= TREND_MAX_POINTS:
+            st.caption(f"Long histories are reduced to {TREND_MAX_POINTS} points per line; "
+                       f"narrow the zoom window to see every day.")
     
-    fig = create_trend_chart(
-        df_all,
+    # Create and display chart
+    fig = get_trend_chart(
         st.session_state.trend_filters["selected_kpi"],
         st.session_state.trend_filters["time_range"],
-        holidays,
-        designers=designers_to_show
+        designers_to_show,
+        window=window
     )
     
     if fig:
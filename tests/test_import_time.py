@@ -0,0 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded lazily by the pages that need them, never on the login page
+HEAVY_MODULES = ["pandas", "numpy", "plotly.express", "jdatetime", "openpyxl", "supabase", "pyarrow"]
+
+
+def test_import_app_skips_heavy_modules(tmp_path):
+    """Importing app (which renders the login page) loads none of the heavy libraries"""
+    code = (
+        "import json, sys\n"
+        f"sys.path.insert(0, {REPO_DIR!r})\n"
+        "import app\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, capture_output=True,
+                            text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []